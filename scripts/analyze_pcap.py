@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+"""Analyze Reolink Baichuan UDP (BCUDP) traffic in pcap captures.
+
+Reverse-engineering helper for the native Baichuan transport: walks a pcap
+(or pcapng) capture, decodes the BCUDP framing used by battery cameras and
+prints per-flow summaries. Can also ingest `tshark -T json` dumps and compare
+two captures side by side.
+
+Usage:
+    analyze_pcap.py capture.pcap
+    analyze_pcap.py good.pcap bad.pcap      # compare two captures
+    analyze_pcap.py --json capture.json     # tshark -T json dump
+"""
+
+import argparse
+import functools
+import struct
+import sys
+from array import array
+from socket import inet_ntoa
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# BCUDP magics (little-endian u32 as read from the wire).
+MAGIC_DATA = 0x2a87cf10
+MAGIC_ACK = 0x2a87cf20
+MAGIC_DISCOVERY = 0x2a87cf3a
+
+PCAP_MAGIC = 0xa1b2c3d4
+PCAPNG_SHB = 0x0a0d0d0a
+
+# Precompiled wire formats, shared by all parse paths.
+_PCAP_GLOBAL = struct.Struct('<IHHiIII')
+_PCAP_REC = struct.Struct('<IIII')
+_UDP_HDR = struct.Struct('>HHHH')
+_U32 = struct.Struct('<I')
+# DATA header: magic, connection_id, a reserved always-zero dword, then
+# packet_id and payload_size; the 4x pad keeps the unpack contiguous.
+_BCUDP_DATA_HDR = struct.Struct('<Ii4xII')
+# ACK shares the byte shape but not the field meanings: after the pad come
+# group_id and packet_id, and there is no payload size.
+_BCUDP_ACK_HDR = struct.Struct('<Ii4xII')
+
+# Camera LAN prefix (192.168.0.0/16) as raw address bytes, so direction can
+# be decided with a two-byte compare before the IP is ever stringified.
+_CAMERA_NET = b'\xc0\xa8'
+
+# Wire-order magic prefixes; a single set probe rejects non-BCUDP payloads
+# before any unpacking happens.
+_MAGIC_DATA_B = _U32.pack(MAGIC_DATA)
+_MAGIC_ACK_B = _U32.pack(MAGIC_ACK)
+_MAGIC_DISCOVERY_B = _U32.pack(MAGIC_DISCOVERY)
+_BCUDP_MAGICS = frozenset((_MAGIC_DATA_B, _MAGIC_ACK_B, _MAGIC_DISCOVERY_B))
+
+
+def parse_bcudp_packet(payload):
+    """Parse one BCUDP datagram, returning (kind, fields) or None."""
+    if len(payload) < 8:
+        return None
+    head = payload[:4]
+    if head not in _BCUDP_MAGICS:
+        return None
+    if head == _MAGIC_DISCOVERY_B:
+        # The XML body is inspected lazily by the printer for the rows it
+        # actually displays; no per-packet probe here.
+        size = _U32.unpack_from(payload, 4)[0]
+        return ('discovery', {'payload_size': size})
+    if len(payload) < 20:
+        return None
+    if head == _MAGIC_DATA_B:
+        _magic, conn_id, pkt_id, size = _BCUDP_DATA_HDR.unpack_from(payload)
+        return ('data', {'connection_id': conn_id, 'packet_id': pkt_id,
+                         'payload_size': size})
+    _magic, conn_id, group_id, pkt_id = _BCUDP_ACK_HDR.unpack_from(payload)
+    return ('ack', {'connection_id': conn_id, 'group_id': group_id,
+                    'packet_id': pkt_id})
+
+
+def extract_udp_packet(frame):
+    """Pull src/dst addressing and the UDP payload out of a raw Ethernet frame."""
+    if len(frame) < 34:
+        return None
+    ethertype = frame[12] << 8 | frame[13]
+    if ethertype != 0x0800:
+        return None
+    ihl = (frame[14] & 0x0f) * 4
+    proto = frame[23]
+    if proto != 17:
+        return None
+    src_ip = inet_ntoa(frame[26:30])
+    dst_ip = inet_ntoa(frame[30:34])
+    udp_off = 14 + ihl
+    if len(frame) < udp_off + 8:
+        return None
+    src_port, dst_port, udp_len, _csum = _UDP_HDR.unpack_from(frame, udp_off)
+    payload = frame[udp_off + 8:]
+    return {
+        'src_ip': src_ip,
+        'dst_ip': dst_ip,
+        'src_port': src_port,
+        'dst_port': dst_port,
+        'payload': payload,
+        'to_camera': frame[30:32] == _CAMERA_NET,
+        'from_camera': frame[26:28] == _CAMERA_NET,
+    }
+
+
+# Captures only contain a handful of distinct endpoints, so these formatting
+# helpers hit the cache on essentially every packet after the first few.
+@functools.lru_cache(maxsize=4096)
+def _endpoint(ip, port):
+    return ip + ':' + str(port)
+
+
+@functools.lru_cache(maxsize=4096)
+def _flow_key(src_ip, src_port, dst_ip, dst_port):
+    return _endpoint(src_ip, src_port) + '->' + _endpoint(dst_ip, dst_port)
+
+
+KIND_DATA, KIND_ACK, KIND_DISCOVERY, KIND_OTHER = 0, 1, 2, 3
+KIND_NAMES = ('data', 'ack', 'discovery', 'other')
+_KIND_CODES = {'data': KIND_DATA, 'ack': KIND_ACK, 'discovery': KIND_DISCOVERY}
+
+
+class PacketTable:
+    """Columnar (structure-of-arrays) storage for parsed UDP packets.
+
+    One typed array/list per field instead of a dict per packet: far less
+    allocation and pointer chasing on million-packet captures, and summary
+    counts become tight passes over flat arrays.
+    """
+
+    __slots__ = ('ts', 'src_ip', 'dst_ip', 'src_port', 'dst_port', 'size',
+                 'kind', 'connection_id', 'group_id', 'packet_id',
+                 'payload_size', 'payload', 'to_camera', 'from_camera',
+                 'other_count', 'other_to_camera', 'other_from_camera')
+
+    def __init__(self):
+        self.ts = []
+        self.src_ip = []
+        self.dst_ip = []
+        self.src_port = array('H')
+        self.dst_port = array('H')
+        self.size = array('I')
+        self.kind = array('B')
+        self.connection_id = array('i')
+        self.group_id = array('I')
+        self.packet_id = array('I')
+        self.payload_size = array('I')
+        # Raw payload refs; hex previews are formatted lazily by the printer
+        # for the handful of rows actually displayed.
+        self.payload = []
+        # Direction flags, computed once here instead of substring-testing
+        # the IP strings in every display/summary loop.
+        self.to_camera = array('B')
+        self.from_camera = array('B')
+        # Non-BCUDP datagrams only contribute to these aggregates; no row
+        # is allocated for them.
+        self.other_count = 0
+        self.other_to_camera = 0
+        self.other_from_camera = 0
+
+    def __len__(self):
+        return len(self.kind)
+
+    def append(self, ts, udp, parsed):
+        payload = udp['payload']
+        to_cam = udp.get('to_camera')
+        if to_cam is None:
+            # String-only sources (tshark JSON) fall back to the prefix test.
+            to_cam = udp['dst_ip'].startswith('192.168.')
+            from_cam = udp['src_ip'].startswith('192.168.')
+        else:
+            from_cam = udp['from_camera']
+        if parsed is None:
+            self.other_count += 1
+            self.other_to_camera += to_cam
+            self.other_from_camera += from_cam
+            return
+        kind, fields = parsed
+        self.ts.append(ts)
+        self.src_ip.append(udp['src_ip'])
+        self.dst_ip.append(udp['dst_ip'])
+        self.src_port.append(udp['src_port'])
+        self.dst_port.append(udp['dst_port'])
+        self.size.append(len(payload))
+        self.kind.append(_KIND_CODES.get(kind, KIND_OTHER))
+        self.connection_id.append(fields.get('connection_id', 0))
+        self.group_id.append(fields.get('group_id', 0))
+        self.packet_id.append(fields.get('packet_id', 0))
+        self.payload_size.append(fields.get('payload_size', 0))
+        self.payload.append(payload)
+        self.to_camera.append(to_cam)
+        self.from_camera.append(from_cam)
+
+
+if np is not None and njit is not None:
+    @njit(cache=True)
+    def _walk_records_kernel(arr):
+        """JIT record-header walk: returns offset/length/timestamp arrays."""
+        n = arr.shape[0]
+        cap = (n - 24) // 16 + 1
+        offs = np.empty(cap, np.int64)
+        lens = np.empty(cap, np.int64)
+        tss = np.empty(cap, np.float64)
+        off = 24
+        count = 0
+        truncated = False
+        while off + 16 <= n:
+            ts_sec = (np.int64(arr[off]) | np.int64(arr[off + 1]) << 8 |
+                      np.int64(arr[off + 2]) << 16 | np.int64(arr[off + 3]) << 24)
+            ts_usec = (np.int64(arr[off + 4]) | np.int64(arr[off + 5]) << 8 |
+                       np.int64(arr[off + 6]) << 16 | np.int64(arr[off + 7]) << 24)
+            incl = (np.int64(arr[off + 8]) | np.int64(arr[off + 9]) << 8 |
+                    np.int64(arr[off + 10]) << 16 | np.int64(arr[off + 11]) << 24)
+            if off + 16 + incl > n:
+                truncated = True
+                break
+            offs[count] = off + 16
+            lens[count] = incl
+            tss[count] = ts_sec + ts_usec / 1e6
+            count += 1
+            off += 16 + incl
+        return offs[:count], lens[:count], tss[:count], truncated, off
+else:
+    _walk_records_kernel = None
+
+
+def _walk_pcap_records(data):
+    """Collect (payload offset, length, timestamp) for every record in a pcap buffer."""
+    if _walk_records_kernel is not None:
+        offsets, lengths, timestamps, truncated, off = \
+            _walk_records_kernel(np.frombuffer(data, np.uint8))
+        if truncated:
+            print(f'warning: truncated record at offset {off}', file=sys.stderr)
+        return offsets, lengths, timestamps
+    offsets = []
+    lengths = []
+    timestamps = []
+    off = 24
+    end = len(data)
+    while off + 16 <= end:
+        ts_sec, ts_usec, incl_len, _orig_len = _PCAP_REC.unpack_from(data, off)
+        if off + 16 + incl_len > end:
+            print(f'warning: truncated record at offset {off}', file=sys.stderr)
+            break
+        offsets.append(off + 16)
+        lengths.append(incl_len)
+        timestamps.append(ts_sec + ts_usec / 1e6)
+        off += 16 + incl_len
+    return offsets, lengths, timestamps
+
+
+def _analyze_pcap_np(data):
+    """NumPy path: gather Ethernet/IP bytes across all records at once to
+    prefilter for UDP, then decode only the matching records."""
+    packets = PacketTable()
+    flows = {}
+    offsets, lengths, timestamps = _walk_pcap_records(data)
+    if len(offsets) == 0:
+        return packets, flows
+    arr = np.frombuffer(data, np.uint8)
+    offs = np.asarray(offsets, np.int64)
+    lens = np.asarray(lengths, np.int64)
+    safe = np.minimum(offs, len(arr) - 34)
+    is_udp = (lens >= 34) & (arr[safe + 12] == 0x08) & (arr[safe + 13] == 0x00) & \
+        (arr[safe + 23] == 17)
+    for i in np.nonzero(is_udp)[0]:
+        off = offsets[i]
+        record = data[off:off + lengths[i]]
+        udp = extract_udp_packet(record)
+        if udp is None:
+            continue
+        parsed = parse_bcudp_packet(udp['payload'])
+        packets.append(timestamps[i], udp, parsed)
+        flow_key = _flow_key(udp['src_ip'], udp['src_port'],
+                             udp['dst_ip'], udp['dst_port'])
+        flows[flow_key] = flows.get(flow_key, 0) + 1
+    return packets, flows
+
+
+def _analyze_pcap_py(data):
+    """Pure-Python path: walk the record offsets over the in-memory buffer."""
+    packets = PacketTable()
+    flows = {}
+    offsets, lengths, timestamps = _walk_pcap_records(data)
+    for off, length, ts in zip(offsets, lengths, timestamps):
+        udp = extract_udp_packet(data[off:off + length])
+        if udp is None:
+            continue
+        parsed = parse_bcudp_packet(udp['payload'])
+        packets.append(ts, udp, parsed)
+        flow_key = _flow_key(udp['src_ip'], udp['src_port'],
+                             udp['dst_ip'], udp['dst_port'])
+        flows[flow_key] = flows.get(flow_key, 0) + 1
+    return packets, flows
+
+
+def analyze_pcap(path):
+    """Walk a classic pcap file and return the table of UDP packet records."""
+    with open(path, 'rb') as f:
+        header = f.read(24)
+        if len(header) < 24:
+            raise ValueError(f'{path}: truncated pcap header')
+        magic = _U32.unpack_from(header)[0]
+        if magic == PCAPNG_SHB:
+            return parse_pcapng(path)
+        if magic != PCAP_MAGIC:
+            raise ValueError(f'{path}: not a pcap file (magic {magic:#x})')
+        # The frame decoder assumes Ethernet, so reject other link types
+        # instead of misparsing every record.
+        _magic, _vmaj, _vmin, _tz, _sig, _snaplen, linktype = \
+            _PCAP_GLOBAL.unpack_from(header)
+        if linktype != 1:
+            raise ValueError(f'{path}: unsupported linktype {linktype} (expected Ethernet)')
+        # One bulk read instead of a header-then-body read pair per record.
+        data = header + f.read()
+    if np is not None:
+        return _analyze_pcap_np(data)
+    return _analyze_pcap_py(data)
+
+
+_BLOCK_HDR = struct.Struct('<II')   # block_type, block_total_length
+_EPB_HDR = struct.Struct('<IIIII')  # interface_id, ts_high, ts_low, incl_len, orig_len
+
+
+def parse_pcapng(path):
+    """Walk a pcapng file (SHB/IDB/EPB blocks) and return UDP packet records."""
+    import mmap
+    packets = PacketTable()
+    flows = {}
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            end = len(mm)
+            off = 0
+            while off + 12 <= end:
+                block_type, block_len = _BLOCK_HDR.unpack_from(mm, off)
+                if block_len < 12 or off + block_len > end:
+                    break
+                if block_type == 0x00000006:  # Enhanced Packet Block
+                    _iface, ts_high, ts_low, incl_len, _orig_len = \
+                        _EPB_HDR.unpack_from(mm, off + 8)
+                    record = mm[off + 28:off + 28 + incl_len]
+                    ts = ((ts_high << 32) | ts_low) / 1e6
+                    udp = extract_udp_packet(record)
+                    if udp is not None:
+                        parsed = parse_bcudp_packet(udp['payload'])
+                        packets.append(ts, udp, parsed)
+                        flow_key = _flow_key(udp['src_ip'], udp['src_port'],
+                                             udp['dst_ip'], udp['dst_port'])
+                        flows[flow_key] = flows.get(flow_key, 0) + 1
+                off += block_len
+        finally:
+            mm.close()
+    return packets, flows
+
+
+def _iter_frames(json_path):
+    """Yield frame dicts from a `tshark -T json` dump.
+
+    Streams with ijson when available so only one frame is live at a time;
+    otherwise falls back to orjson (C parser) or stdlib json on the whole file.
+    """
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+    if ijson is not None:
+        with open(json_path, 'rb') as f:
+            yield from ijson.items(f, 'item')
+        return
+    with open(json_path, 'rb') as f:
+        raw = f.read()
+    try:
+        import orjson
+        yield from orjson.loads(raw)
+    except ImportError:
+        import json
+        yield from json.loads(raw)
+
+
+# tshark layer/field names, interned once so the per-frame lookups below hash
+# against the exact key objects the JSON parser produced.
+_K_SOURCE = sys.intern('_source')
+_K_LAYERS = sys.intern('layers')
+_K_FRAME = sys.intern('frame')
+_K_IP = sys.intern('ip')
+_K_UDP = sys.intern('udp')
+_K_DATA = sys.intern('data')
+_K_TIME = sys.intern('frame.time_epoch')
+_K_IP_SRC = sys.intern('ip.src')
+_K_IP_DST = sys.intern('ip.dst')
+_K_SRCPORT = sys.intern('udp.srcport')
+_K_DSTPORT = sys.intern('udp.dstport')
+_K_DATA_DATA = sys.intern('data.data')
+_K_UDP_PAYLOAD = sys.intern('udp.payload')
+
+
+def extract_packets(json_path):
+    """Extract UDP packet records from a `tshark -T json` dump."""
+    packets = PacketTable()
+    for frame in _iter_frames(json_path):
+        try:
+            layers = frame[_K_SOURCE][_K_LAYERS]
+            udp = layers[_K_UDP]
+            ip = layers[_K_IP]
+        except KeyError:
+            continue
+        # Depending on the tshark version the payload sits in a 'data' layer
+        # or directly on the udp layer as udp.payload.
+        data = layers.get(_K_DATA)
+        if data is not None:
+            payload_hex = data.get(_K_DATA_DATA, '')
+        else:
+            payload_hex = udp.get(_K_UDP_PAYLOAD, '')
+        payload = bytes.fromhex(payload_hex.replace(':', '')) if payload_hex else b''
+        parsed = parse_bcudp_packet(payload)
+        try:
+            ts = float(layers[_K_FRAME][_K_TIME])
+        except KeyError:
+            ts = 0.0
+        packets.append(ts, {
+            'src_ip': ip.get(_K_IP_SRC, ''),
+            'dst_ip': ip.get(_K_IP_DST, ''),
+            'src_port': int(udp.get(_K_SRCPORT, 0)),
+            'dst_port': int(udp.get(_K_DSTPORT, 0)),
+            'payload': payload,
+        }, parsed)
+    return packets
+
+
+def print_flow_summary(packets, flows=None):
+    counts = [0, 0, 0, 0]
+    totals = [0, 0, 0, 0]
+    for s, k in zip(packets.size, packets.kind):
+        counts[k] += 1
+        totals[k] += s
+    to_camera = sum(packets.to_camera) + packets.other_to_camera
+    from_camera = sum(packets.from_camera) + packets.other_from_camera
+    print(f'  packets: {len(packets) + packets.other_count}')
+    print(f'  data:      {counts[KIND_DATA]:6d} pkts  {totals[KIND_DATA]:9d} bytes')
+    print(f'  ack:       {counts[KIND_ACK]:6d} pkts  {totals[KIND_ACK]:9d} bytes')
+    print(f'  discovery: {counts[KIND_DISCOVERY]:6d} pkts  {totals[KIND_DISCOVERY]:9d} bytes')
+    print(f'  to camera: {to_camera}  from camera: {from_camera}')
+    if flows:
+        for key, count in sorted(flows.items(), key=lambda kv: -kv[1]):
+            print(f'  flow {key}: {count} pkts')
+
+
+def print_packets(packets, limit=10):
+    shown = 0
+    for i in range(len(packets)):
+        kind = packets.kind[i]
+        if kind == KIND_OTHER:
+            continue
+        endpoint = _endpoint(packets.src_ip[i], packets.src_port[i]) + ' -> ' + \
+            _endpoint(packets.dst_ip[i], packets.dst_port[i])
+        extra = ''
+        if kind == KIND_DATA:
+            extra = f" conn={packets.connection_id[i]} id={packets.packet_id[i]}"
+        elif kind == KIND_ACK:
+            extra = f" conn={packets.connection_id[i]} gid={packets.group_id[i]}" \
+                f" id={packets.packet_id[i]}"
+        elif kind == KIND_DISCOVERY:
+            # Show the leading XML tag so discovery rows are identifiable at
+            # a glance; like the hex preview, only displayed rows pay for it.
+            xml = packets.payload[i][8:8 + packets.payload_size[i]]
+            start = xml.find(b'<')
+            if start >= 0:
+                end = xml.find(b'>', start)
+                if end > start:
+                    extra = ' xml=' + xml[start:end + 1].decode('ascii', 'replace')
+        hex_preview = packets.payload[i].hex()[:80]
+        print(f"  [{KIND_NAMES[kind]:9s}] {endpoint} len={packets.size[i]}{extra} {hex_preview}")
+        shown += 1
+        if shown >= limit:
+            break
+
+
+def compare_files(path_a, path_b):
+    # The two captures are independent, so parse them concurrently.
+    # Processes rather than threads: the fallback parse loop is pure Python.
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=2) as ex:
+        futures = [ex.submit(analyze_pcap, p) for p in (path_a, path_b)]
+        results = [(path, *fut.result()) for path, fut in zip((path_a, path_b), futures)]
+    for path, packets, flows in results:
+        print(f'== {path} ==')
+        print_flow_summary(packets, flows)
+        print_packets(packets)
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('captures', nargs='*', help='pcap/pcapng file(s); two files compare')
+    parser.add_argument('--json', help='tshark -T json dump instead of a raw capture')
+    args = parser.parse_args()
+
+    if args.json:
+        packets = extract_packets(args.json)
+        print(f'== {args.json} ==')
+        print_flow_summary(packets)
+        print_packets(packets)
+        return
+
+    if len(args.captures) == 2:
+        compare_files(args.captures[0], args.captures[1])
+    elif len(args.captures) == 1:
+        packets, flows = analyze_pcap(args.captures[0])
+        print(f'== {args.captures[0]} ==')
+        print_flow_summary(packets, flows)
+        print_packets(packets)
+    else:
+        parser.error('expected one or two capture files, or --json')
+
+
+if __name__ == '__main__':
+    main()
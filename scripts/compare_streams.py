@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""Compare BCUDP video stream captures from two clients (e.g. neolink vs scrypted).
+
+Takes `tshark -T json` exports of the same camera streaming session, extracts
+the BCUDP data/ack flows and reports packet counts, throughput and packet-id
+gaps per capture, plus a side-by-side comparison when two files are given.
+
+Usage:
+    compare_streams.py neolink.json scrypted.json
+    compare_streams.py capture.json
+
+Runs unmodified under PyPy, which is worth it for multi-GB exports: the hot
+loops avoid dict merges and re-looked-up bound methods, and without orjson
+the stdlib json fallback is what PyPy optimizes best.
+"""
+
+import argparse
+import json
+import struct
+from collections import namedtuple
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# orjson deserializes the dict-heavy tshark output several times faster than
+# stdlib json; under PyPy (where orjson does not build) the stdlib fallback
+# is the right choice anyway.
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    orjson = None
+    _loads = json.loads
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# One fixed-width record per packet instead of a dict: with NumPy installed
+# the whole capture lives in a single structured array and rows still answer
+# p['field'] lookups, so the analysis code is representation-agnostic.
+_PACKET_FIELDS = ('frame_num', 'time', 'src_ip', 'is_camera', 'src_port',
+                  'dst_port', 'type', 'connection_id', 'group_id', 'packet_id',
+                  'payload_len')
+_PACKET_DTYPE = np.dtype([
+    ('frame_num', 'i4'), ('time', 'f8'), ('src_ip', 'U15'), ('is_camera', '?'),
+    ('src_port', 'u2'), ('dst_port', 'u2'), ('type', 'U9'),
+    ('connection_id', 'i4'), ('group_id', 'u4'), ('packet_id', 'u4'),
+    ('payload_len', 'u4'),
+]) if np is not None else None
+
+# BCUDP magics in wire order (little-endian u32 0x2a87cfXX).
+BCUDP_MAGIC_DATA = b'\x10\xcf\x87\x2a'
+BCUDP_MAGIC_ACK = b'\x20\xcf\x87\x2a'
+BCUDP_MAGIC_DISCOVERY = b'\x3a\xcf\x87\x2a'
+
+# DATA fields after the 4-byte magic: connection_id, a reserved always-zero
+# dword (skipped by the 4x pad), then packet_id and payload_len.
+_BCUDP_DATA_FIELDS = struct.Struct('<i4xII')
+# ACK shares the byte shape but not the meanings: after the pad come
+# group_id and packet_id, and there is no payload length.
+_BCUDP_ACK_FIELDS = struct.Struct('<i4xII')
+
+
+def parse_bcudp_data(data):
+    """Header fields of a BCUDP DATA packet (magic already matched)."""
+    if len(data) < 20:
+        return None
+    connection_id, packet_id, payload_len = _BCUDP_DATA_FIELDS.unpack_from(data, 4)
+    return {'connection_id': connection_id, 'packet_id': packet_id,
+            'payload_len': payload_len}
+
+
+def parse_bcudp_ack(data):
+    """Header fields of a BCUDP ACK packet (magic already matched)."""
+    if len(data) < 20:
+        return None
+    connection_id, group_id, packet_id = _BCUDP_ACK_FIELDS.unpack_from(data, 4)
+    return {'connection_id': connection_id, 'group_id': group_id,
+            'packet_id': packet_id}
+
+
+# Camera classification on the raw NDJSON line, before JSON decoding: a pair
+# of byte prefix tests (tshark emits both spacings) replaces a per-packet
+# string scan on the decoded address.
+_SRC_CAMERA_RAW = (b'"ip.src":"192.168.', b'"ip.src": "192.168.')
+_SRC_KEY_RAW = b'"ip.src"'
+
+
+def _iter_stream_entries(json_path):
+    """Yield (entry, is_camera) pairs from a `-T json` array or NDJSON lines.
+
+    NDJSON exports (one object per line, either bare layers documents or the
+    `_source`-wrapped entries of a line-delimited `-T json` array) are the
+    cheapest to ingest: processing starts at line one and never holds more
+    than a line in memory, and the source address classifies from the raw
+    line bytes before the JSON is even decoded. Plain `-T json` arrays
+    stream through ijson when available, then fall back to parsing the whole
+    file with orjson or stdlib json; those yield is_camera=None and the
+    caller classifies the decoded address instead.
+
+    Real `tshark -T ek` output is not supported: it mangles field names
+    (ip_ip_src, udp_udp_payload) so none of the lookups here would match.
+    """
+    if json_path.endswith('.ndjson'):
+        with open(json_path, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                if line.find(_SRC_CAMERA_RAW[0]) != -1 or \
+                        line.find(_SRC_CAMERA_RAW[1]) != -1:
+                    is_camera = True
+                elif line.find(_SRC_KEY_RAW) != -1:
+                    is_camera = False
+                else:
+                    is_camera = None
+                entry = _loads(line)
+                # Accept both shapes of a line-delimited export: bare
+                # {"layers": ...} documents and {"_source": ...} entries
+                # split out of a -T json array. Stray action/index lines
+                # carry neither and are skipped.
+                if 'layers' in entry or '_source' in entry:
+                    yield entry, is_camera
+        return
+    with open(json_path, 'rb') as f:
+        if ijson is not None:
+            entries = ijson.items(f, 'item')
+        elif orjson is not None:
+            entries = orjson.loads(f.read())
+        else:
+            entries = json.load(f)
+        for entry in entries:
+            yield entry, None
+
+
+def extract_stream_packets(json_path):
+    """Extract BCUDP packets from a tshark JSON or NDJSON export."""
+    rows = []
+    rows_append = rows.append
+    from_hex = bytes.fromhex
+    for entry, is_camera in _iter_stream_entries(json_path):
+        layers = entry.get('_source', {}).get('layers') or entry.get('layers') or {}
+        udp = layers.get('udp')
+        if udp is None:
+            continue
+        payload_hex = udp.get('udp.payload', '')
+        if not payload_hex:
+            continue
+        try:
+            # Common case: tshark emits udp.payload without separators.
+            payload = from_hex(payload_hex)
+        except ValueError:
+            payload = from_hex(payload_hex.replace(':', '').replace(' ', ''))
+        head = payload[:4]
+        if head == BCUDP_MAGIC_DATA:
+            pkt_type = 'data'
+            pkt_data = parse_bcudp_data(payload)
+        elif head == BCUDP_MAGIC_ACK:
+            pkt_type = 'ack'
+            pkt_data = parse_bcudp_ack(payload)
+        elif head == BCUDP_MAGIC_DISCOVERY:
+            pkt_type = 'discovery'
+            pkt_data = {}
+        else:
+            continue
+        if pkt_data is None:
+            continue
+        frame = layers.get('frame', {})
+        ip = layers.get('ip', {})
+        src_ip = ip.get('ip.src', '')
+        if is_camera is None:
+            is_camera = src_ip.startswith('192.168.')
+        rows_append((
+            int(frame.get('frame.number', 0)),
+            float(frame.get('frame.time_relative', 0.0)),
+            src_ip,
+            # Classified once here; every later direction split reuses the flag
+            # instead of rescanning the address string.
+            is_camera,
+            int(udp.get('udp.srcport', 0)),
+            int(udp.get('udp.dstport', 0)),
+            pkt_type,
+            pkt_data.get('connection_id', 0),
+            pkt_data.get('group_id', 0),
+            pkt_data.get('packet_id', 0),
+            pkt_data.get('payload_len', 0),
+        ))
+    if np is not None:
+        return np.array(rows, dtype=_PACKET_DTYPE)
+    return [dict(zip(_PACKET_FIELDS, row)) for row in rows]
+
+
+# Per-capture packets plus their direction/type splits, computed once by
+# split_streams so analysis and comparison never re-filter the same list.
+Streams = namedtuple('Streams', ('all', 'camera_data', 'client_data',
+                                 'camera_ack', 'client_ack'))
+
+
+def split_streams(packets):
+    """Bucket packets by (direction, type) in a single pass."""
+    camera_data = []
+    client_data = []
+    camera_ack = []
+    client_ack = []
+    for p in packets:
+        pkt_type = p['type']
+        if pkt_type == 'data':
+            (camera_data if p['is_camera'] else client_data).append(p)
+        elif pkt_type == 'ack':
+            (camera_ack if p['is_camera'] else client_ack).append(p)
+    return Streams(packets, camera_data, client_data, camera_ack, client_ack)
+
+
+def analyze_stream_flow(streams, label):
+    """Print per-direction counts, throughput and packet-id gaps."""
+    print(f'== {label} ==')
+    camera_data = streams.camera_data
+    client_data = streams.client_data
+    camera_ack = streams.camera_ack
+    client_ack = streams.client_ack
+    print(f'  camera data: {len(camera_data):6d}   client data: {len(client_data):6d}')
+    print(f'  camera ack:  {len(camera_ack):6d}   client ack:  {len(client_ack):6d}')
+    if not camera_data:
+        return
+    # Bind the boundary rows once; each [0]/[-1] index repeats a bounds check
+    # and row lookup otherwise.
+    first = camera_data[0]
+    last = camera_data[-1]
+    first_t = first['time']
+    last_t = last['time']
+    print(f"  first data: frame {first['frame_num']} "
+          f"t={first_t:.3f} pid={first['packet_id']}")
+    print(f"  last data:  frame {last['frame_num']} "
+          f"t={last_t:.3f} pid={last['packet_id']}")
+    span = last_t - first_t
+    total = sum(p['payload_len'] for p in camera_data)
+    if span > 0:
+        print(f'  throughput: {total / span / 1024:.1f} KiB/s over {span:.1f}s')
+    if np is not None:
+        # Sort + diff + threshold all run in C; the common no-gap case never
+        # builds a single Python tuple.
+        pids = np.fromiter((p['packet_id'] for p in camera_data),
+                           dtype=np.uint32, count=len(camera_data))
+        pids.sort()
+        deltas = np.diff(pids)
+        gap_idx = np.flatnonzero(deltas > 1)
+        gaps = list(zip(pids[gap_idx].tolist(), pids[gap_idx + 1].tolist()))
+    else:
+        pids = sorted([p['packet_id'] for p in camera_data])
+        gaps = []
+        for i in range(len(pids) - 1):
+            if pids[i + 1] - pids[i] > 1:
+                gaps.append((pids[i], pids[i + 1]))
+    print(f'  pid range: {pids[0]}..{pids[-1]}  gaps: {len(gaps)}')
+    for lo, hi in gaps[:5]:
+        print(f'    gap {lo} -> {hi} ({hi - lo - 1} missing)')
+
+
+def compare_streams(nl_streams, sc_streams, nl_label, sc_label):
+    """Side-by-side camera-data / client-ack comparison of the two captures."""
+    nl_camera_data = nl_streams.camera_data
+    sc_camera_data = sc_streams.camera_data
+    nl_client_ack = nl_streams.client_ack
+    sc_client_ack = sc_streams.client_ack
+    print('== comparison ==')
+    print(f'  camera data: {nl_label}={len(nl_camera_data)} {sc_label}={len(sc_camera_data)}')
+    print(f'  client ack:  {nl_label}={len(nl_client_ack)} {sc_label}={len(sc_client_ack)}')
+    nl_bytes = sum(p['payload_len'] for p in nl_camera_data)
+    sc_bytes = sum(p['payload_len'] for p in sc_camera_data)
+    print(f'  camera bytes: {nl_label}={nl_bytes} {sc_label}={sc_bytes}')
+    if nl_camera_data and sc_camera_data:
+        ratio = len(sc_camera_data) / len(nl_camera_data)
+        print(f'  data packet ratio ({sc_label}/{nl_label}): {ratio:.2f}')
+
+
+class StreamStats:
+    """Constant-memory per-capture accumulator for --stats-only runs.
+
+    Instead of packet records it keeps per-(direction, type) counters, the
+    boundary camera-data rows, and a bitset keyed by packet_id; gap detection
+    reads the bitset instead of sorting every pid, so memory stays O(pid
+    range / 8) no matter how many packets the capture holds.
+    """
+
+    __slots__ = ('camera_data', 'client_data', 'camera_ack', 'client_ack',
+                 'camera_bytes', 'first', 'last', 'pid_min', 'pid_max',
+                 'pid_bits')
+
+    def __init__(self):
+        self.camera_data = 0
+        self.client_data = 0
+        self.camera_ack = 0
+        self.client_ack = 0
+        self.camera_bytes = 0
+        self.first = None  # (frame_num, time, packet_id) of first camera data
+        self.last = None
+        self.pid_min = None
+        self.pid_max = None
+        self.pid_bits = bytearray(4096)
+
+    def add_camera_data(self, frame_num, time, packet_id, payload_len):
+        self.camera_data += 1
+        self.camera_bytes += payload_len
+        row = (frame_num, time, packet_id)
+        if self.first is None:
+            self.first = row
+            self.pid_min = self.pid_max = packet_id
+        else:
+            if packet_id < self.pid_min:
+                self.pid_min = packet_id
+            if packet_id > self.pid_max:
+                self.pid_max = packet_id
+        self.last = row
+        bits = self.pid_bits
+        byte = packet_id >> 3
+        if byte >= len(bits):
+            bits.extend(bytes(byte + 1 - len(bits)))
+        bits[byte] |= 1 << (packet_id & 7)
+
+    def pid_gaps(self):
+        """(lo, hi) pairs of present pids with missing ids between them."""
+        if self.pid_min is None or self.pid_max <= self.pid_min:
+            return []
+        if np is not None:
+            flat = np.unpackbits(np.frombuffer(self.pid_bits, dtype=np.uint8),
+                                 bitorder='little')
+            present = np.flatnonzero(flat[self.pid_min:self.pid_max + 1])
+            deltas = np.diff(present)
+            gap_idx = np.flatnonzero(deltas > 1)
+            base = self.pid_min
+            return [(base + int(present[i]), base + int(present[i + 1]))
+                    for i in gap_idx]
+        bits = self.pid_bits
+        gaps = []
+        prev = self.pid_min
+        for pid in range(self.pid_min + 1, self.pid_max + 1):
+            if bits[pid >> 3] & (1 << (pid & 7)):
+                if pid - prev > 1:
+                    gaps.append((prev, pid))
+                prev = pid
+        return gaps
+
+
+def collect_stream_stats(json_path):
+    """Stream a capture once, accumulating StreamStats without packet records."""
+    stats = StreamStats()
+    from_hex = bytes.fromhex
+    unpack_header = _BCUDP_DATA_FIELDS.unpack_from
+    for entry, is_camera in _iter_stream_entries(json_path):
+        layers = entry.get('_source', {}).get('layers') or entry.get('layers') or {}
+        udp = layers.get('udp')
+        if udp is None:
+            continue
+        payload_hex = udp.get('udp.payload', '')
+        if not payload_hex:
+            continue
+        try:
+            payload = from_hex(payload_hex)
+        except ValueError:
+            payload = from_hex(payload_hex.replace(':', '').replace(' ', ''))
+        head = payload[:4]
+        if head != BCUDP_MAGIC_DATA and head != BCUDP_MAGIC_ACK:
+            continue
+        if len(payload) < 20:
+            continue
+        if is_camera is None:
+            is_camera = layers.get('ip', {}).get('ip.src', '').startswith('192.168.')
+        if head == BCUDP_MAGIC_ACK:
+            if is_camera:
+                stats.camera_ack += 1
+            else:
+                stats.client_ack += 1
+            continue
+        if not is_camera:
+            stats.client_data += 1
+            continue
+        _, packet_id, payload_len = unpack_header(payload, 4)
+        frame = layers.get('frame', {})
+        stats.add_camera_data(int(frame.get('frame.number', 0)),
+                              float(frame.get('frame.time_relative', 0.0)),
+                              packet_id, payload_len)
+    return stats
+
+
+def print_stream_stats(stats, label):
+    """Per-direction counts, throughput and gaps from streamed counters."""
+    print(f'== {label} ==')
+    print(f'  camera data: {stats.camera_data:6d}   client data: {stats.client_data:6d}')
+    print(f'  camera ack:  {stats.camera_ack:6d}   client ack:  {stats.client_ack:6d}')
+    if stats.first is None:
+        return
+    first_frame, first_t, first_pid = stats.first
+    last_frame, last_t, last_pid = stats.last
+    print(f'  first data: frame {first_frame} t={first_t:.3f} pid={first_pid}')
+    print(f'  last data:  frame {last_frame} t={last_t:.3f} pid={last_pid}')
+    span = last_t - first_t
+    if span > 0:
+        print(f'  throughput: {stats.camera_bytes / span / 1024:.1f} KiB/s over {span:.1f}s')
+    gaps = stats.pid_gaps()
+    print(f'  pid range: {stats.pid_min}..{stats.pid_max}  gaps: {len(gaps)}')
+    for lo, hi in gaps[:5]:
+        print(f'    gap {lo} -> {hi} ({hi - lo - 1} missing)')
+
+
+def compare_stream_stats(nl_stats, sc_stats, nl_label, sc_label):
+    """Side-by-side comparison from streamed counters."""
+    print('== comparison ==')
+    print(f'  camera data: {nl_label}={nl_stats.camera_data} {sc_label}={sc_stats.camera_data}')
+    print(f'  client ack:  {nl_label}={nl_stats.client_ack} {sc_label}={sc_stats.client_ack}')
+    print(f'  camera bytes: {nl_label}={nl_stats.camera_bytes} {sc_label}={sc_stats.camera_bytes}')
+    if nl_stats.camera_data and sc_stats.camera_data:
+        ratio = sc_stats.camera_data / nl_stats.camera_data
+        print(f'  data packet ratio ({sc_label}/{nl_label}): {ratio:.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('captures', nargs='+',
+                        help='one or two tshark -T json exports')
+    parser.add_argument('--stats-only', action='store_true',
+                        help='stream counters only; constant memory, no packet records')
+    args = parser.parse_args()
+    if len(args.captures) > 2:
+        parser.error('expected one or two capture files')
+
+    if args.stats_only:
+        results = [(path, collect_stream_stats(path)) for path in args.captures]
+        for path, stats in results:
+            print_stream_stats(stats, path)
+        if len(results) == 2:
+            (nl_path, nl_stats), (sc_path, sc_stats) = results
+            compare_stream_stats(nl_stats, sc_stats, nl_path, sc_path)
+        return
+
+    results = [(path, split_streams(extract_stream_packets(path)))
+               for path in args.captures]
+    for path, streams in results:
+        analyze_stream_flow(streams, path)
+    if len(results) == 2:
+        (nl_path, nl_streams), (sc_path, sc_streams) = results
+        compare_streams(nl_streams, sc_streams, nl_path, sc_path)
+
+
+if __name__ == '__main__':
+    main()